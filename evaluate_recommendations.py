@@ -0,0 +1,292 @@
+# app/scripts/evaluate_recommendations.py
+"""
+离线推荐评估与延迟测试工具。
+
+用法 (在项目根目录下运行):
+    python -m app.scripts.evaluate_recommendations --jsonl favorites.jsonl --k 5
+    python -m app.scripts.evaluate_recommendations --db-url mysql+pymysql://... --strategies cf,popular
+
+流程:
+1. 从数据库或 JSONL 文件加载收藏数据 (user_id, post_id, created_at)。
+2. 按 UserFavorite.created_at 做时间切分：较早的收藏作为训练集，较晚的作为测试集。
+3. 把训练集写入内存 SQLite 数据库，用真实的推荐服务函数为每个用户生成推荐。
+4. 输出每个策略的 precision@k、recall@k、coverage 以及单用户延迟分位数。
+   延迟分为冷/热两组：cold 是清空收藏索引后的首次调用 (与一次全新请求的工作量相当)，
+   warm 是索引已加载后对同一用户的再次调用。质量指标取自 cold 调用。
+
+注意：即使使用 --db-url，推荐也是在训练集的内存 SQLite 副本上执行的，延迟数字反映的是
+各策略在本地的相对开销，不包含网络往返。协同过滤会对每个已收藏帖子各执行一次邻居查询，
+在 MySQL 上每次查询都要付出一次往返，实际延迟会明显高于这里的数字，比较策略成本时需要考虑这一点。
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from ..models.posts import Post, UserFavorite
+from ..services.favorites_index import get_favorites_index
+from ..services.recommendation_service import (
+    get_most_popular_posts,
+    get_item_based_collaborative_filtering_recommendations,
+    get_random_posts
+)
+
+# (user_id, post_id, created_at)
+FavoriteRecord = Tuple[int, int, datetime]
+
+
+# --- 推荐策略注册表 ---
+# 每个策略的签名统一为 (session, user_id, limit) -> List[Post]，新增策略时在这里注册即可
+STRATEGIES: Dict[str, Callable[[Session, int, int], List[Post]]] = {
+    "cf": lambda session, user_id, limit: get_item_based_collaborative_filtering_recommendations(
+        session=session, user_id=user_id, limit=limit
+    ),
+    "popular": lambda session, user_id, limit: get_most_popular_posts(session=session, limit=limit),
+    "random": lambda session, user_id, limit: get_random_posts(
+        session=session, current_user_id=user_id, limit=limit
+    ),
+}
+
+
+# --- 数据加载 ---
+def parse_timestamp(value: str) -> datetime:
+    """
+    解析 ISO 格式时间并统一为不带时区的 UTC 时间 (与 UserFavorite.created_at 的 utcnow 一致)，
+    避免带时区和不带时区的时间混在一起比较时报错。
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def load_favorites_from_db(database_url: str) -> Tuple[List[FavoriteRecord], List[int]]:
+    """
+    从数据库读取全部收藏记录和全部帖子 ID。
+    """
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        favorites = [
+            (fav.user_id, fav.post_id, fav.created_at)
+            for fav in session.exec(select(UserFavorite)).all()
+        ]
+        post_ids = list(session.exec(select(Post.id)).all())
+    engine.dispose()
+    return favorites, post_ids
+
+
+def load_favorites_from_jsonl(path: str) -> Tuple[List[FavoriteRecord], List[int]]:
+    """
+    从 JSONL 文件读取收藏记录，每行形如:
+        {"user_id": 1, "post_id": 3, "created_at": "2025-06-05T10:00:00"}
+    帖子集合取收藏中出现过的全部 post_id。
+    """
+    favorites = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                favorites.append(
+                    (int(row["user_id"]), int(row["post_id"]), parse_timestamp(row["created_at"]))
+                )
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f"Invalid favorite record at line {line_no}: {e!r}") from e
+    post_ids = sorted({post_id for _, post_id, _ in favorites})
+    return favorites, post_ids
+
+
+def time_split(
+        favorites: Sequence[FavoriteRecord],
+        train_ratio: float = 0.8,
+        split_at: Optional[datetime] = None
+) -> Tuple[List[FavoriteRecord], List[FavoriteRecord]]:
+    """
+    按 created_at 切分训练集和测试集。
+    指定 split_at 时以该时间点为界，否则按时间顺序取前 train_ratio 比例作为训练集。
+    """
+    ordered = sorted(favorites, key=lambda fav: fav[2])
+    if split_at is None:
+        cutoff = int(len(ordered) * train_ratio)
+        return ordered[:cutoff], ordered[cutoff:]
+    train = [fav for fav in ordered if fav[2] < split_at]
+    test = [fav for fav in ordered if fav[2] >= split_at]
+    return train, test
+
+
+def build_train_session(train: Sequence[FavoriteRecord], post_ids: Sequence[int]) -> Session:
+    """
+    把训练集写入内存 SQLite 数据库，推荐服务函数可以直接在这个会话上运行。
+    SQLite 默认不检查外键，所以这里只需要写入 posts 和 user_favorites 两张表。
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    session.add_all([Post(id=post_id, title="", content="", author_id=0) for post_id in post_ids])
+    session.add_all([
+        UserFavorite(user_id=user_id, post_id=post_id, created_at=created_at)
+        for user_id, post_id, created_at in train
+    ])
+    session.commit()
+    return session
+
+
+# --- 指标 ---
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    线性插值分位数，pct 取值 0~100。
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def evaluate_strategy(
+        session: Session,
+        strategy: Callable[[Session, int, int], List[Post]],
+        test_by_user: Dict[int, Set[int]],
+        catalog_size: int,
+        k: int = 5
+) -> dict:
+    """
+    对测试集中的每个用户运行策略，返回质量和延迟指标。
+    每个用户先清空收藏索引测一次冷延迟，再立即重复调用测一次热延迟，
+    这样延迟不依赖用户的评估顺序，也不依赖缓存何时过期。
+    """
+    favorites_index = get_favorites_index(session)
+    precisions = []
+    recalls = []
+    cold_latencies_ms = []
+    warm_latencies_ms = []
+    recommended_items: Set[int] = set()
+
+    for user_id, relevant in test_by_user.items():
+        favorites_index.invalidate()
+        start = time.perf_counter()
+        recommendations = strategy(session, user_id, k)
+        cold_latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        strategy(session, user_id, k)
+        warm_latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        rec_ids = [post.id for post in recommendations][:k]
+        recommended_items.update(rec_ids)
+        hits = len(relevant.intersection(rec_ids))
+        precisions.append(hits / k)
+        recalls.append(hits / len(relevant))
+
+    users = len(test_by_user)
+    return {
+        "users": users,
+        f"precision@{k}": sum(precisions) / users if users else 0.0,
+        f"recall@{k}": sum(recalls) / users if users else 0.0,
+        "coverage": len(recommended_items) / catalog_size if catalog_size else 0.0,
+        "cold_p50_ms": percentile(cold_latencies_ms, 50),
+        "cold_p90_ms": percentile(cold_latencies_ms, 90),
+        "cold_p99_ms": percentile(cold_latencies_ms, 99),
+        "cold_max_ms": max(cold_latencies_ms) if cold_latencies_ms else 0.0,
+        "warm_p50_ms": percentile(warm_latencies_ms, 50),
+        "warm_p90_ms": percentile(warm_latencies_ms, 90),
+        "warm_p99_ms": percentile(warm_latencies_ms, 99),
+    }
+
+
+def format_report(results: Dict[str, dict], k: int) -> str:
+    columns = ["users", f"precision@{k}", f"recall@{k}", "coverage",
+               "cold_p50_ms", "cold_p90_ms", "cold_p99_ms", "cold_max_ms",
+               "warm_p50_ms", "warm_p90_ms", "warm_p99_ms"]
+    lines = ["strategy".ljust(10) + "".join(col.rjust(14) for col in columns)]
+    for name, metrics in results.items():
+        cells = []
+        for col in columns:
+            value = metrics[col]
+            cells.append((str(value) if isinstance(value, int) else f"{value:.4f}").rjust(14))
+        lines.append(name.ljust(10) + "".join(cells))
+    lines.append("cold: 每个用户调用前清空收藏索引；warm: 索引已加载后的重复调用")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="离线评估推荐策略的质量与延迟")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--db-url", help="数据库连接串，默认使用 config.DATABASE_URL")
+    source.add_argument("--jsonl", help="收藏数据 JSONL 文件路径")
+    parser.add_argument("--k", type=int, default=5, help="每个用户推荐的帖子数量")
+    parser.add_argument("--train-ratio", type=float, default=0.8, help="按时间顺序划入训练集的比例")
+    parser.add_argument("--split-at", type=parse_timestamp, help="训练/测试切分时间点 (ISO 格式)")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        help=f"逗号分隔的策略列表，可选: {', '.join(STRATEGIES)}")
+    parser.add_argument("--seed", type=int, default=42, help="随机策略的随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出结果")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+
+    strategy_names = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    unknown = [name for name in strategy_names if name not in STRATEGIES]
+    if unknown:
+        print(f"Unknown strategies: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    if args.jsonl:
+        favorites, post_ids = load_favorites_from_jsonl(args.jsonl)
+    else:
+        if args.db_url:
+            database_url = args.db_url
+        else:
+            from ..config import DATABASE_URL
+            database_url = DATABASE_URL
+        favorites, post_ids = load_favorites_from_db(database_url)
+
+    train, test = time_split(favorites, train_ratio=args.train_ratio, split_at=args.split_at)
+    if not test:
+        print("Test split is empty, nothing to evaluate.", file=sys.stderr)
+        return 1
+
+    test_by_user: Dict[int, Set[int]] = {}
+    for user_id, post_id, _ in test:
+        test_by_user.setdefault(user_id, set()).add(post_id)
+
+    print(f"Loaded {len(favorites)} favorites over {len(post_ids)} posts: "
+          f"{len(train)} train / {len(test)} test, {len(test_by_user)} users to evaluate.",
+          file=sys.stderr)
+
+    session = build_train_session(train, post_ids)
+    results = {}
+    try:
+        for name in strategy_names:
+            random.seed(args.seed)
+            results[name] = evaluate_strategy(
+                session, STRATEGIES[name], test_by_user, catalog_size=len(post_ids), k=args.k
+            )
+    finally:
+        session.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results, args.k))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
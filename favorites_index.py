@@ -0,0 +1,268 @@
+# app/services/favorites_index.py
+"""
+按用户缓存收藏帖子 ID 的紧凑索引。
+
+每个用户的收藏保存为有序的 int 数组 (array('q'))，成员判断用二分查找，O(log n)；
+用户条目按 LRU 淘汰。通过 get_favorites_index(session) 获取索引：
+- 默认 (FAVORITES_INDEX_SHARED=false)：索引挂在数据库会话上，只在一次请求内复用，
+  解决 /for-you 中同一用户的收藏被重复查询的问题，结果与数据库读取完全一致；
+- FAVORITES_INDEX_SHARED=true：进程内共享索引，跨请求复用。其他 worker 进程的写入
+  只能在条目过期 (FAVORITES_INDEX_TTL) 后感知，属于最终一致，需要显式开启。
+收藏的写入路径 (db_add_favorite / db_remove_favorite) 会同步更新索引。
+缓存中的 FavoriteSet 不会被原地修改：写入时生成新的集合替换条目，
+已经拿到旧集合的读者 (例如正在归并扫描的协同过滤) 不受影响。
+"""
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+
+from ..models.posts import UserFavorite
+
+# --- 索引配置 ---
+FAVORITES_INDEX_SHARED = os.getenv("FAVORITES_INDEX_SHARED", "false").lower() in ("1", "true", "yes")
+FAVORITES_INDEX_CAPACITY = int(os.getenv("FAVORITES_INDEX_CAPACITY", 10000))  # 最多缓存的用户数
+FAVORITES_INDEX_TTL = float(os.getenv("FAVORITES_INDEX_TTL", 60))  # 秒，仅对共享索引生效，<= 0 表示不过期
+
+# session.info 中使用的键
+_SESSION_INDEX_KEY = "favorites_index"
+_SESSION_GENERATION_KEY = "favorites_index_generation"
+
+
+class FavoriteSet:
+    """
+    单个用户收藏的帖子 ID，内部是升序、无重复的 int 数组。
+    """
+    __slots__ = ("_ids",)
+
+    def __init__(self, post_ids: Iterable[int] = ()):
+        self._ids = array("q", sorted(set(post_ids)))
+
+    @classmethod
+    def _from_sorted(cls, ids: array) -> "FavoriteSet":
+        favorite_set = cls.__new__(cls)
+        favorite_set._ids = ids
+        return favorite_set
+
+    def __contains__(self, post_id: int) -> bool:
+        i = bisect_left(self._ids, post_id)
+        return i < len(self._ids) and self._ids[i] == post_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def with_added(self, post_id: int) -> "FavoriteSet":
+        """
+        返回加入 post_id 后的新集合，自身不变；已包含时返回自身。
+        """
+        i = bisect_left(self._ids, post_id)
+        if i < len(self._ids) and self._ids[i] == post_id:
+            return self
+        ids = self._ids[:i]
+        ids.append(post_id)
+        ids.extend(self._ids[i:])
+        return FavoriteSet._from_sorted(ids)
+
+    def without(self, post_id: int) -> "FavoriteSet":
+        """
+        返回去掉 post_id 后的新集合，自身不变；不包含时返回自身。
+        """
+        i = bisect_left(self._ids, post_id)
+        if i == len(self._ids) or self._ids[i] != post_id:
+            return self
+        return FavoriteSet._from_sorted(self._ids[:i] + self._ids[i + 1:])
+
+    def exclude(self, post_ids: Iterable[int]) -> List[int]:
+        """
+        从 post_ids 中去掉已收藏的帖子，保持原有顺序。
+        传入另一个 FavoriteSet 时两边都有序，用一次归并扫描完成。
+        """
+        if isinstance(post_ids, FavoriteSet):
+            result = []
+            mine = self._ids
+            i, n = 0, len(mine)
+            for post_id in post_ids._ids:
+                while i < n and mine[i] < post_id:
+                    i += 1
+                if i == n or mine[i] != post_id:
+                    result.append(post_id)
+            return result
+        return [post_id for post_id in post_ids if post_id not in self]
+
+
+class FavoritesIndex:
+    """
+    user_id -> FavoriteSet 的 LRU 缓存，线程安全。
+    shared=True 表示该索引跨会话共享，此时需要防止把旧快照读到的数据放进缓存。
+    """
+
+    def __init__(
+            self,
+            capacity: int = FAVORITES_INDEX_CAPACITY,
+            ttl: float = FAVORITES_INDEX_TTL,
+            shared: bool = True
+    ):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.shared = shared
+        self._entries: "OrderedDict[int, Tuple[FavoriteSet, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次写入都会递增；读到的数据早于某次写入时不放入缓存，避免缓存旧数据
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _lookup(self, user_id: int) -> Optional[FavoriteSet]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        favorite_set, loaded_at = entry
+        if self.ttl > 0 and time.monotonic() - loaded_at > self.ttl:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return favorite_set
+
+    def _store(self, user_id: int, favorite_set: FavoriteSet) -> None:
+        self._entries[user_id] = (favorite_set, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def _load(self, session: Session, user_ids: List[int]) -> Dict[int, List[int]]:
+        rows = session.exec(
+            select(UserFavorite.user_id, UserFavorite.post_id).where(UserFavorite.user_id.in_(user_ids))
+        ).all()
+        loaded: Dict[int, List[int]] = {user_id: [] for user_id in user_ids}
+        for user_id, post_id in rows:
+            loaded[user_id].append(post_id)
+        return loaded
+
+    def _snapshot_generation(self, session: Session) -> int:
+        """
+        返回本次加载所读数据对应的写入代数。
+        共享索引在会话事务已经开启时 (例如 MySQL REPEATABLE READ 下先查询过用户)，
+        读到的是事务开始时的快照，因此使用事务开始时记录的代数；没有记录时返回 -1，不缓存。
+        """
+        if self.shared and session.in_transaction():
+            return session.info.get(_SESSION_GENERATION_KEY, -1)
+        return self._generation
+
+    def get(self, session: Session, user_id: int) -> FavoriteSet:
+        return self.get_many(session, [user_id])[user_id]
+
+    def get_many(self, session: Session, user_ids: Iterable[int]) -> Dict[int, FavoriteSet]:
+        """
+        批量获取多个用户的收藏集合，未命中的用户用一次 IN 查询加载。
+        """
+        result: Dict[int, FavoriteSet] = {}
+        missing: List[int] = []
+        seen = set()
+        with self._lock:
+            for user_id in user_ids:
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                favorite_set = self._lookup(user_id)
+                if favorite_set is None:
+                    missing.append(user_id)
+                    self.misses += 1
+                else:
+                    result[user_id] = favorite_set
+                    self.hits += 1
+            generation = self._snapshot_generation(session)
+
+        if not missing:
+            return result
+
+        loaded = self._load(session, missing)
+
+        with self._lock:
+            cacheable = generation == self._generation
+            for user_id, post_ids in loaded.items():
+                favorite_set = FavoriteSet(post_ids)
+                result[user_id] = favorite_set
+                if cacheable:
+                    self._store(user_id, favorite_set)
+        return result
+
+    def _replace(self, user_id: int, favorite_set: FavoriteSet) -> None:
+        # 替换条目但保留加载时间，写入不会延长条目的有效期
+        _, loaded_at = self._entries[user_id]
+        self._entries[user_id] = (favorite_set, loaded_at)
+
+    def add(self, user_id: int, post_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            favorite_set = self._lookup(user_id)
+            if favorite_set is not None:
+                self._replace(user_id, favorite_set.with_added(post_id))
+
+    def discard(self, user_id: int, post_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            favorite_set = self._lookup(user_id)
+            if favorite_set is not None:
+                self._replace(user_id, favorite_set.without(post_id))
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """
+        使某个用户 (或全部用户) 的缓存失效。
+        """
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "capacity": self.capacity,
+                "shared": self.shared,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# 进程内共享的索引实例 (仅在 FAVORITES_INDEX_SHARED=true 时使用)
+favorites_index = FavoritesIndex()
+
+
+def _record_snapshot_generation(session, transaction, connection):
+    # 记录会话事务开始 (即数据库快照建立) 时共享索引的写入代数
+    session.info[_SESSION_GENERATION_KEY] = favorites_index.generation
+
+
+# 只有共享索引需要快照代数；请求级索引不注册监听，避免给每个事务增加开销
+if FAVORITES_INDEX_SHARED:
+    event.listen(SASession, "after_begin", _record_snapshot_generation)
+
+
+def get_favorites_index(session: Session) -> FavoritesIndex:
+    """
+    获取当前会话应使用的收藏索引：默认是挂在会话上的请求级索引，开启共享时是进程级索引。
+    """
+    if FAVORITES_INDEX_SHARED:
+        return favorites_index
+    index = session.info.get(_SESSION_INDEX_KEY)
+    if index is None:
+        index = FavoritesIndex(ttl=0, shared=False)
+        session.info[_SESSION_INDEX_KEY] = index
+    return index
@@ -8,10 +8,34 @@ from sqlmodel import Session, select
 from ..models.posts import Post, PostCreate, UserFavorite
 from ..models.users import User  # 用于类型提示
 from ..config import UPLOAD_DIR
+from ..utils.task_queue import dispatch, register_handler  # 写入后的副作用交给后台任务队列
+from .favorites_index import get_favorites_index
+
+# 不超过该大小的上传文件在请求中只读入内存，帖子提交后由后台任务写盘；
+# 更大的文件仍在请求中直接写盘，避免占用过多内存
+UPLOAD_ASYNC_MAX_BYTES = int(os.getenv("UPLOAD_ASYNC_MAX_BYTES", 5 * 1024 * 1024))
+
+
+def store_post_upload(upload_location: Optional[str] = None, upload_data: Optional[bytes] = None, **payload) -> None:
+    """
+    post_created 事件的处理函数：把上传文件写入磁盘。
+    先写临时文件再原子替换，失败重试时不会留下写了一半的文件。
+    """
+    if upload_location is None or upload_data is None:
+        return
+    tmp_location = f"{upload_location}.part"
+    with open(tmp_location, "wb") as file_object:
+        file_object.write(upload_data)
+    os.replace(tmp_location, upload_location)
+
+
+register_handler("post_created", store_post_upload)
 
 
 def db_create_post(session: Session, post_data: PostCreate, author_id: int, file: Optional[UploadFile] = None) -> Post:
     file_path_to_save = None
+    upload_location = None
+    upload_data = None
     if file:
         # 确保上传目录存在
         os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -23,8 +47,14 @@ def db_create_post(session: Session, post_data: PostCreate, author_id: int, file
         file_location = os.path.join(UPLOAD_DIR, filename)
 
         try:
-            with open(file_location, "wb+") as file_object:
-                shutil.copyfileobj(file.file, file_object)
+            file.file.seek(0, os.SEEK_END)
+            file_size = file.file.tell()
+            file.file.seek(0)
+            if file_size <= UPLOAD_ASYNC_MAX_BYTES:
+                upload_location, upload_data = file_location, file.file.read()
+            else:
+                with open(file_location, "wb+") as file_object:
+                    shutil.copyfileobj(file.file, file_object)
             file_path_to_save = os.path.join("static", "uploads", filename)  # 存储相对路径，用于URL访问
         except Exception as e:
             # 处理文件保存错误
@@ -41,6 +71,14 @@ def db_create_post(session: Session, post_data: PostCreate, author_id: int, file
     session.add(db_post)
     session.commit()
     session.refresh(db_post)
+    # 帖子已提交，文件写盘等副作用交给后台队列，接口可以立即返回
+    dispatch(
+        "post_created",
+        post_id=db_post.id,
+        author_id=author_id,
+        upload_location=upload_location,
+        upload_data=upload_data
+    )
     return db_post
 
 
@@ -70,6 +108,9 @@ def db_add_favorite(session: Session, user_id: int, post_id: int) -> UserFavorit
     session.add(favorite)
     session.commit()
     session.refresh(favorite)
+    # 索引同步更新而不是放进后台队列，保证用户紧接着的请求能看到最新的收藏
+    get_favorites_index(session).add(user_id, post_id)
+    dispatch("favorite_added", user_id=user_id, post_id=post_id)
     return favorite
 
 
@@ -82,6 +123,8 @@ def db_remove_favorite(session: Session, user_id: int, post_id: int):
 
     session.delete(favorite)
     session.commit()
+    get_favorites_index(session).discard(user_id, post_id)
+    dispatch("favorite_removed", user_id=user_id, post_id=post_id)
     return {"message": "Favorite removed successfully"}
 
 
@@ -4,6 +4,7 @@ from sqlmodel import Session, select, func  # func 用于 SQL 函数如 COUNT
 
 from ..models.posts import Post, UserFavorite
 from ..models.users import User  # 确保 User 也被导入了，如果 get_random_posts 的 current_user_id 类型提示需要
+from .favorites_index import get_favorites_index
 
 
 # ... (get_most_popular_posts 函数代码) ...
@@ -30,15 +31,16 @@ def get_item_based_collaborative_filtering_recommendations(
 ) -> List[Post]:
     """
     基于物品的协同过滤推荐 (简化版)。
+    得分相同的候选帖子按帖子 ID 升序排列，保证同一份数据的推荐结果是确定的。
     """
-    user_favorites_statement = select(UserFavorite.post_id).where(UserFavorite.user_id == user_id)
-    user_favorited_post_ids_list = session.exec(user_favorites_statement).all()  # 这是一个 post_id 的列表
-    if not user_favorited_post_ids_list:
+    favorites_index = get_favorites_index(session)
+    user_favorited_post_ids = favorites_index.get(session, user_id)  # 有序数组，成员判断为 O(log n)
+    if not user_favorited_post_ids:
         return []
 
     candidate_posts_scores = {}
 
-    for fav_post_id in user_favorited_post_ids_list:
+    for fav_post_id in user_favorited_post_ids:
         other_users_who_favorited_this_post_stmt = (
             select(UserFavorite.user_id)
             .where(UserFavorite.post_id == fav_post_id)
@@ -49,13 +51,12 @@ def get_item_based_collaborative_filtering_recommendations(
         if not other_user_ids:
             continue
 
+        # 邻居用户的收藏也从索引获取，未命中的用户一次性批量加载，不再逐个执行 NOT IN 查询
+        other_users_favorites = favorites_index.get_many(session, other_user_ids)
         for other_user_id in other_user_ids:
-            other_user_favorites_stmt = (
-                select(UserFavorite.post_id)
-                .where(UserFavorite.user_id == other_user_id)
-                .where(UserFavorite.post_id.notin_(user_favorited_post_ids_list))  # 确保这里是列表
+            recommended_for_other_user_post_ids = user_favorited_post_ids.exclude(
+                other_users_favorites[other_user_id]
             )
-            recommended_for_other_user_post_ids = session.exec(other_user_favorites_stmt).all()
 
             for rec_post_id in recommended_for_other_user_post_ids:
                 candidate_posts_scores[rec_post_id] = candidate_posts_scores.get(rec_post_id, 0) + 1
@@ -65,8 +66,7 @@ def get_item_based_collaborative_filtering_recommendations(
 
     sorted_candidate_post_ids = sorted(
         candidate_posts_scores.keys(),
-        key=lambda post_id: candidate_posts_scores[post_id],
-        reverse=True
+        key=lambda post_id: (-candidate_posts_scores[post_id], post_id)
     )
     top_n_post_ids = sorted_candidate_post_ids[:limit]
 
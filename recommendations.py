@@ -2,12 +2,11 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session
-from sqlmodel import Session, select
-from ..models.posts import UserFavorite # 确保 UserFavorite 模型也被导入
 from ..database import get_session
 from ..models.posts import PostRead  # 用于响应模型
 from ..models.users import User
 from ..services.auth_service import get_current_active_user  # 用于获取当前用户
+from ..services.favorites_index import get_favorites_index
 from ..services.recommendation_service import (
     get_most_popular_posts,
     get_item_based_collaborative_filtering_recommendations,
@@ -57,8 +56,7 @@ async def get_recommendations_for_current_user(
 
         # 过滤掉已在协同过滤推荐中的 和 用户已收藏的 (协同过滤算法本身应该处理了已收藏)
         existing_rec_ids = {rec.id for rec in recommendations}
-        user_favorited_post_ids_stmt = select(UserFavorite.post_id).where(UserFavorite.user_id == current_user.id)
-        user_favorited_post_ids = {pid for pid in session.exec(user_favorited_post_ids_stmt).all()}
+        user_favorited_post_ids = get_favorites_index(session).get(session, current_user.id)  # 与协同过滤共用同一份索引
 
         supplement_posts = []
         for post in supplement_candidates:
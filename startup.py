@@ -0,0 +1,185 @@
+# app/startup.py
+"""
+快速启动：只有模型指纹变化时才执行 create_all，并输出启动各阶段耗时。
+
+main.py 和 database.py 不在本仓库中，需要按下面的方式接入。
+
+main.py —— 在文件最顶部创建计时器，并把路由导入包在计时阶段里：
+    from .startup import StartupTimer, run_startup
+    startup_timer = StartupTimer()
+
+    with startup_timer.phase("import routers"):
+        from .api import auth as auth_router
+        from .api import posts as posts_router
+        from .api import recommendations as recommendations_router
+
+main.py —— 把原来的 on_startup 替换为：
+    @app.on_event("startup")
+    def on_startup():
+        run_startup(engine, timer=startup_timer)
+
+database.py —— 默认关闭 SQL 日志 (echo=True 会在启动和每个请求中打印全部 SQL)：
+    import os
+    engine = create_engine(
+        DATABASE_URL, echo=os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+    )
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
+from sqlmodel import SQLModel
+
+from .models import users, posts  # 导入模型模块以确保表被元数据捕获
+
+# --- 快速启动配置 ---
+# FAST_STARTUP=true 时，只有当模型指纹与数据库中记录的版本不一致时才执行 create_all
+FAST_STARTUP = os.getenv("FAST_STARTUP", "true").lower() in ("1", "true", "yes")
+# 是否在启动结束时打印各阶段耗时
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "true").lower() in ("1", "true", "yes")
+
+# schema_version 表使用独立的 MetaData，不会混入 SQLModel.metadata，也不会影响指纹本身
+_version_metadata = MetaData()
+schema_version_table = Table(
+    "schema_version",
+    _version_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+class StartupTimer:
+    """
+    记录启动过程中各阶段的耗时，并在启动结束时输出一份明细。
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - phase_start))
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def report(self) -> str:
+        lines = ["Startup time breakdown:"]
+        for name, elapsed in self.phases:
+            lines.append(f"  {name:<24} {elapsed * 1000:8.1f} ms")
+        lines.append(f"  {'total':<24} {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+def compute_metadata_fingerprint(metadata: MetaData = SQLModel.metadata) -> str:
+    """
+    根据表、列、约束和索引的定义计算模型元数据的指纹。
+    任何会影响 create_all 结果的模型改动都会改变这个指纹。
+    """
+    parts = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        parts.append(f"table:{table.name}")
+        for column in table.columns:
+            parts.append(
+                f"column:{column.name}:{column.type!r}:{column.nullable}:"
+                f"{column.primary_key}:{column.unique}:{column.index}"
+            )
+        for fk in sorted(table.foreign_keys, key=lambda f: f.target_fullname):
+            parts.append(f"fk:{fk.parent.name}->{fk.target_fullname}")
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            parts.append(f"index:{index.name}:{','.join(c.name for c in index.columns)}:{index.unique}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def get_stored_fingerprint(engine: Engine) -> Optional[str]:
+    """
+    读取数据库中记录的模型指纹。表不存在或读取失败时返回 None。
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                schema_version_table.select().where(schema_version_table.c.id == 1)
+            ).first()
+    except SQLAlchemyError:
+        return None
+    return row.fingerprint if row is not None else None
+
+
+def store_fingerprint(engine: Engine, fingerprint: str) -> bool:
+    """
+    记录模型指纹。多个 worker 同时启动时可能并发建表或写入同一行，
+    此时不让启动失败，而是重新读取已记录的指纹：与当前一致说明其他 worker 已经写入。
+    返回 False 表示本次没有记录成功，下次启动会重新执行 create_all。
+    """
+    values = {"fingerprint": fingerprint, "updated_at": datetime.utcnow()}
+    try:
+        _version_metadata.create_all(engine)
+        with engine.begin() as conn:
+            result = conn.execute(
+                schema_version_table.update().where(schema_version_table.c.id == 1).values(**values)
+            )
+            if result.rowcount == 0:
+                conn.execute(schema_version_table.insert().values(id=1, **values))
+    except (IntegrityError, OperationalError) as e:
+        if get_stored_fingerprint(engine) == fingerprint:
+            return True
+        print(f"Warning: could not record schema fingerprint, create_all will run again next startup: {e}")
+        return False
+    return True
+
+
+def ensure_schema(engine: Engine, timer: Optional[StartupTimer] = None, force: bool = False) -> bool:
+    """
+    只在模型指纹变化时执行 SQLModel.metadata.create_all。
+    返回 True 表示执行了 create_all，False 表示因指纹一致而跳过。
+    """
+    timer = timer or StartupTimer()
+
+    with timer.phase("fingerprint"):
+        fingerprint = compute_metadata_fingerprint(SQLModel.metadata)
+
+    if not force:
+        with timer.phase("schema version check"):
+            stored = get_stored_fingerprint(engine)
+        if stored == fingerprint:
+            return False
+
+    with timer.phase("create_all"):
+        try:
+            SQLModel.metadata.create_all(engine)
+        except OperationalError:
+            # 另一个 worker 在检查和建表之间抢先建了表，再执行一次 (checkfirst 会跳过已存在的表)
+            SQLModel.metadata.create_all(engine)
+    with timer.phase("store fingerprint"):
+        store_fingerprint(engine, fingerprint)
+    return True
+
+
+def run_startup(engine: Engine, timer: Optional[StartupTimer] = None) -> Dict[str, float]:
+    """
+    供 main.py 的 startup 事件调用，替代直接调用 create_db_and_tables()。
+    传入在 main.py 顶部创建的 timer 可以把路由/服务的导入耗时一并计入报告。
+    """
+    timer = timer or StartupTimer()
+
+    created = ensure_schema(engine, timer=timer, force=not FAST_STARTUP)
+    if created:
+        print("Database schema changed or not yet recorded: create_all executed.")
+    else:
+        print("Database schema fingerprint matches: skipped create_all.")
+
+    if STARTUP_REPORT:
+        print(timer.report())
+    return dict(timer.phases)
@@ -0,0 +1,383 @@
+# app/utils/task_queue.py
+"""
+进程内的轻量级后台任务队列，用于执行写入之后的副作用 (缓存失效、索引更新、文件处理等)，
+让写接口在数据行提交后即可返回。
+
+main.py 不在本仓库中，需要按下面的方式接入 (main.py 目前使用 on_event，两者不能混用，
+FastAPI 传入 lifespan 后 on_event 注册的处理函数不会执行)，在 app = FastAPI(...) 之后加入:
+    from .utils.task_queue import start_task_queue, stop_task_queue
+    app.add_event_handler("startup", start_task_queue)
+    app.add_event_handler("shutdown", stop_task_queue)
+如果以后改用 lifespan，则使用:
+    from .utils.task_queue import lifespan
+    app = FastAPI(..., lifespan=lifespan)
+队列未启动时任务会在调用方同步执行 (第一次会打印警告)，行为与接入前一致。
+
+服务层通过事件派发任务，例如 post_service 中上传文件的写入:
+    register_handler("post_created", store_post_upload)
+    dispatch("post_created", post_id=post.id, upload_location=..., upload_data=...)
+"""
+import asyncio
+import functools
+import inspect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# --- 队列配置 ---
+TASK_QUEUE_MAXSIZE = int(os.getenv("TASK_QUEUE_MAXSIZE", 1000))
+TASK_QUEUE_WORKERS = int(os.getenv("TASK_QUEUE_WORKERS", 2))
+TASK_QUEUE_MAX_RETRIES = int(os.getenv("TASK_QUEUE_MAX_RETRIES", 3))
+TASK_QUEUE_RETRY_BACKOFF = float(os.getenv("TASK_QUEUE_RETRY_BACKOFF", 0.5))  # 秒，每次重试翻倍
+TASK_QUEUE_MAX_BACKOFF = float(os.getenv("TASK_QUEUE_MAX_BACKOFF", 30))
+TASK_QUEUE_PROCESS_WORKERS = int(os.getenv("TASK_QUEUE_PROCESS_WORKERS", 0)) or None  # None 表示使用 CPU 核数
+TASK_QUEUE_DRAIN_TIMEOUT = float(os.getenv("TASK_QUEUE_DRAIN_TIMEOUT", 30))
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+# 队列已满时的处理方式：run 绕过队列直接调度执行 (默认，保证副作用不丢失)，drop 丢弃并计数
+ON_FULL_RUN = "run"
+ON_FULL_DROP = "drop"
+
+
+def _job_name(func: Callable) -> str:
+    return getattr(func, "__name__", repr(func))
+
+
+def validate_job_options(func: Callable, executor: str, on_full: str) -> None:
+    if executor not in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+        raise ValueError(f"Unknown executor: {executor}")
+    if on_full not in (ON_FULL_RUN, ON_FULL_DROP):
+        raise ValueError(f"Unknown on_full policy: {on_full}")
+    if executor == EXECUTOR_PROCESS and inspect.iscoroutinefunction(func):
+        raise ValueError(f"Coroutine job {_job_name(func)} cannot run on the process executor")
+
+
+class Job:
+    __slots__ = ("func", "args", "kwargs", "executor", "max_retries", "on_full", "enqueued_at", "attempts")
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, executor: str, max_retries: int, on_full: str):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.executor = executor
+        self.max_retries = max_retries
+        self.on_full = on_full
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class TaskQueue:
+    """
+    基于 asyncio.Queue 的有界任务队列。
+    - 协程函数直接在事件循环中执行；
+    - 普通函数默认放到线程池执行，CPU 密集型任务可以指定 executor="process"
+      (此时函数和参数必须可以被 pickle)；
+    - 失败的任务按指数退避重试，超过重试次数后记录失败；
+    - 队列已满时默认绕过队列直接调度任务 (on_full="run")，仍然使用对应的执行器并支持重试，
+      也可以选择丢弃 (on_full="drop")；
+    - 关闭时先等待队列中的任务执行完毕 (有超时)，再停止工作协程。
+    """
+
+    def __init__(
+            self,
+            maxsize: int = TASK_QUEUE_MAXSIZE,
+            workers: int = TASK_QUEUE_WORKERS,
+            max_retries: int = TASK_QUEUE_MAX_RETRIES,
+            retry_backoff: float = TASK_QUEUE_RETRY_BACKOFF,
+            max_backoff: float = TASK_QUEUE_MAX_BACKOFF,
+            process_workers: Optional[int] = TASK_QUEUE_PROCESS_WORKERS
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.process_workers = process_workers
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._overflow_tasks: Set[asyncio.Task] = set()
+        self._warned_not_running = False
+        self._thread_executor: Optional[ThreadPoolExecutor] = None
+        self._process_executor: Optional[ProcessPoolExecutor] = None
+        self._accepting = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "dropped": 0,
+            "overflow_run": 0,
+            "in_flight": 0,
+        }
+        self._lag_count = 0
+        self._lag_total = 0.0
+        self._lag_last = 0.0
+        self._lag_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    async def start(self) -> None:
+        if self._accepting:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._thread_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task-queue")
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"task-queue-worker-{i}") for i in range(self.workers)
+        ]
+        self._accepting = True
+        print(f"Task queue started: {self.workers} workers, capacity {self.maxsize}.")
+
+    async def stop(self, timeout: float = TASK_QUEUE_DRAIN_TIMEOUT) -> None:
+        """
+        停止接收新任务，等待队列排空 (最多 timeout 秒)，然后关闭工作协程和执行器。
+        """
+        if not self._accepting:
+            return
+        self._accepting = False
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"Task queue drain timed out after {timeout}s, {self._queue.qsize()} queued and "
+                  f"{self._stats['in_flight']} running jobs discarded.")
+
+        tasks = self._worker_tasks + list(self._overflow_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._overflow_tasks.clear()
+
+        if self._thread_executor is not None:
+            self._thread_executor.shutdown(wait=False)
+            self._thread_executor = None
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=False)
+            self._process_executor = None
+        print("Task queue stopped.")
+
+    async def _drain(self) -> None:
+        await self._queue.join()
+        while self._overflow_tasks:
+            await asyncio.gather(*list(self._overflow_tasks), return_exceptions=True)
+
+    def submit(
+            self,
+            func: Callable,
+            args: tuple = (),
+            kwargs: Optional[dict] = None,
+            executor: str = EXECUTOR_THREAD,
+            max_retries: Optional[int] = None,
+            on_full: str = ON_FULL_RUN
+    ) -> bool:
+        """
+        提交一个任务，立即返回。返回 False 表示任务被丢弃或执行失败。
+        - 队列已满时按 on_full 处理：run 绕过队列直接调度 (不阻塞事件循环)，drop 丢弃；
+        - 队列未启动时 (例如 main.py 尚未接入 lifespan，或在脚本中直接调用服务函数)
+          普通函数会在调用方同步执行，第一次发生时打印警告；
+        - 从事件循环以外的线程调用时，任务通过 call_soon_threadsafe 转交给事件循环，
+          此时返回 True 只表示已转交，是否入队要到事件循环处理时才知道
+          (默认的 on_full="run" 下任务不会因为队列满而丢失；转交时队列正在关闭的任务会在事件循环中同步执行)。
+        """
+        validate_job_options(func, executor, on_full)
+        kwargs = kwargs or {}
+
+        if not self._accepting:
+            if inspect.iscoroutinefunction(func):
+                print(f"Task queue not running, skipped coroutine job {_job_name(func)}.")
+                return False
+            if not self._warned_not_running:
+                self._warned_not_running = True
+                print(f"Warning: task queue not running, job {_job_name(func)} runs inline in the caller. "
+                      f"Start it with lifespan/start_task_queue in main.py.")
+            return self._call_inline(func, args, kwargs)
+
+        job = Job(
+            func, args, kwargs, executor,
+            self.max_retries if max_retries is None else max_retries,
+            on_full
+        )
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            return self._put(job)
+        self._loop.call_soon_threadsafe(self._put, job)
+        return True
+
+    def _call_inline(self, func: Callable, args: tuple, kwargs: dict) -> bool:
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            # 数据已经提交，副作用失败不应影响写接口的结果
+            self._stats["failed"] += 1
+            print(f"Inline job {_job_name(func)} failed: {e}")
+            return False
+        self._stats["completed"] += 1
+        return True
+
+    def _put(self, job: Job) -> bool:
+        if not self._accepting:
+            # 跨线程提交的任务在转交途中队列开始关闭：工作协程可能已经退出，不能再入队
+            if inspect.iscoroutinefunction(job.func):
+                self._stats["dropped"] += 1
+                print(f"Task queue stopping, dropped coroutine job {_job_name(job.func)}.")
+                return False
+            return self._call_inline(job.func, job.args, job.kwargs)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            if job.on_full == ON_FULL_DROP:
+                self._stats["dropped"] += 1
+                print(f"Task queue full ({self.maxsize}), dropped job {_job_name(job.func)}.")
+                return False
+            self._stats["overflow_run"] += 1
+            task = self._loop.create_task(self._run_overflow(job))
+            self._overflow_tasks.add(task)
+            task.add_done_callback(self._overflow_tasks.discard)
+            return True
+        self._stats["submitted"] += 1
+        return True
+
+    async def _run_overflow(self, job: Job) -> None:
+        self._stats["in_flight"] += 1
+        try:
+            await self._run_with_retry(job)
+        finally:
+            self._stats["in_flight"] -= 1
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            lag = time.monotonic() - job.enqueued_at
+            self._lag_last = lag
+            self._lag_max = max(self._lag_max, lag)
+            self._lag_total += lag
+            self._lag_count += 1
+
+            self._stats["in_flight"] += 1
+            try:
+                await self._run_with_retry(job)
+            finally:
+                self._stats["in_flight"] -= 1
+                self._queue.task_done()
+
+    async def _run_with_retry(self, job: Job) -> None:
+        while True:
+            job.attempts += 1
+            try:
+                await self._run(job)
+                self._stats["completed"] += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                name = _job_name(job.func)
+                if job.attempts > job.max_retries:
+                    self._stats["failed"] += 1
+                    print(f"Task {name} failed after {job.attempts} attempts: {e}")
+                    return
+                self._stats["retried"] += 1
+                delay = self.backoff_delay(job.attempts)
+                print(f"Task {name} failed (attempt {job.attempts}), retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        第 attempt 次失败后的重试等待时间：retry_backoff * 2^(attempt-1)，不超过 max_backoff。
+        """
+        return min(self.retry_backoff * (2 ** (attempt - 1)), self.max_backoff)
+
+    async def _run(self, job: Job) -> Any:
+        if inspect.iscoroutinefunction(job.func):
+            return await job.func(*job.args, **job.kwargs)
+
+        if job.executor == EXECUTOR_PROCESS:
+            if self._process_executor is None:
+                self._process_executor = ProcessPoolExecutor(max_workers=self.process_workers)
+            executor = self._process_executor
+        else:
+            executor = self._thread_executor
+        # run_in_executor 不支持关键字参数；partial 在函数和参数可 pickle 时也可以发送到进程池
+        call = functools.partial(job.func, *job.args, **job.kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        返回队列深度、延迟 (任务从入队到开始执行的等待时间) 和各类计数。
+        """
+        return {
+            "running": self._accepting,
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "capacity": self.maxsize,
+            "workers": self.workers,
+            **self._stats,
+            "lag_last_ms": self._lag_last * 1000,
+            "lag_max_ms": self._lag_max * 1000,
+            "lag_avg_ms": (self._lag_total / self._lag_count * 1000) if self._lag_count else 0.0,
+        }
+
+
+# 全局队列实例
+task_queue = TaskQueue()
+
+
+# --- 写入后事件 ---
+# event -> [(handler, submit 选项)]
+_handlers: Dict[str, List[Tuple[Callable, dict]]] = {}
+
+
+def register_handler(
+        event: str,
+        func: Callable,
+        executor: str = EXECUTOR_THREAD,
+        max_retries: Optional[int] = None,
+        on_full: str = ON_FULL_RUN
+) -> None:
+    """
+    为写入事件注册一个后台处理函数，例如 "post_created"、"favorite_added"。
+    处理函数以 dispatch 时传入的关键字参数调用。
+    """
+    validate_job_options(func, executor, on_full)
+    _handlers.setdefault(event, []).append(
+        (func, {"executor": executor, "max_retries": max_retries, "on_full": on_full})
+    )
+
+
+def dispatch(event: str, **payload) -> None:
+    """
+    把事件的所有处理函数提交到后台队列。没有注册处理函数时不做任何事。
+    """
+    for func, options in _handlers.get(event, []):
+        task_queue.submit(func, kwargs=payload, **options)
+
+
+async def start_task_queue() -> None:
+    await task_queue.start()
+
+
+async def stop_task_queue() -> None:
+    await task_queue.stop()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await start_task_queue()
+    try:
+        yield
+    finally:
+        await stop_task_queue()
@@ -0,0 +1,82 @@
+# tests/conftest.py
+"""
+让测试以 app.xxx 的方式导入项目代码 (与 run.py 中的 "app.main:app" 一致)。
+
+- 完整项目结构 (项目根目录下有 app/ 包) 时，把项目根目录加入 sys.path 即可正常导入；
+- 本仓库中的源码是平铺存放的 (例如 app/services/post_service.py 对应根目录下的 post_service.py)，
+  此时由 _FlatTreeFinder 按下面的映射表把 app.xxx 模块名对应到平铺文件上，
+  文件内的相对导入 (from ..models.posts import ...) 可以照常工作。
+
+映射表中没有的模块 (config、database、main 不在本仓库中) 导入时会抛出 ModuleNotFoundError，
+依赖它们的测试用 pytest.importorskip 跳过。
+
+运行方式：在仓库根目录执行 python -m pytest -q
+(需要安装 sqlmodel；测试服务层还需要 fastapi 和 python-dotenv)。
+"""
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+# 包名 -> 包的 __init__ 文件 (None 表示没有 __init__，作为空包处理)
+_PACKAGES = {
+    "app": None,
+    "app.models": "__init__.py",
+    "app.services": None,
+    "app.api": None,
+    "app.utils": None,
+    "app.scripts": None,
+}
+
+# 模块名 -> 平铺文件
+_MODULES = {
+    "app.startup": "startup.py",
+    "app.models.users": "users.py",
+    "app.models.posts": "posts.py",
+    "app.services.auth_service": "auth_service.py",
+    "app.services.post_service": "post_service.py",
+    "app.services.user_service": "user_service.py",
+    "app.services.recommendation_service": "recommendation_service.py",
+    "app.services.favorites_index": "favorites_index.py",
+    "app.api.auth": "auth.py",
+    "app.api.recommendations": "recommendations.py",
+    "app.utils.security": "security.py",
+    "app.utils.task_queue": "task_queue.py",
+    "app.scripts.evaluate_recommendations": "evaluate_recommendations.py",
+}
+
+
+class _FlatTreeFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if fullname in _PACKAGES:
+            init_file = _PACKAGES[fullname]
+            if init_file is None:
+                spec = importlib.machinery.ModuleSpec(fullname, None, is_package=True)
+                spec.submodule_search_locations = []
+                return spec
+            return importlib.util.spec_from_file_location(
+                fullname, os.path.join(ROOT, init_file), submodule_search_locations=[]
+            )
+        filename = _MODULES.get(fullname)
+        if filename is not None:
+            return importlib.util.spec_from_file_location(fullname, os.path.join(ROOT, filename))
+        return None
+
+
+# 完整项目结构下 app/ 包可以被常规方式找到，只有找不到时才使用平铺映射
+if importlib.util.find_spec("app") is None:
+    sys.meta_path.append(_FlatTreeFinder())
+
+    # 仓库根目录的 __init__.py 就是 app/models/__init__.py。pytest 会把根目录当作一个包
+    # (包名为目录名) 导入，导致模型被重复定义；这里让该包名直接指向已导入的 app.models。
+    try:
+        import app.models as _models
+    except ImportError:  # 未安装 sqlmodel 时依赖模型的测试会被跳过
+        pass
+    else:
+        sys.modules.setdefault(os.path.basename(ROOT), _models)
@@ -0,0 +1,105 @@
+# tests/test_evaluate_recommendations.py
+import json
+from datetime import datetime
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlmodel")
+
+from app.scripts.evaluate_recommendations import (
+    build_train_session,
+    evaluate_strategy,
+    load_favorites_from_jsonl,
+    parse_timestamp,
+    percentile,
+    time_split,
+)
+
+
+def _fav(user_id, post_id, day):
+    return (user_id, post_id, datetime(2025, 6, day))
+
+
+def test_time_split_by_ratio_keeps_time_order():
+    favorites = [_fav(1, 1, 3), _fav(1, 2, 1), _fav(2, 3, 4), _fav(2, 1, 2), _fav(3, 2, 5)]
+    train, test = time_split(favorites, train_ratio=0.6)
+    assert [fav[2].day for fav in train] == [1, 2, 3]
+    assert [fav[2].day for fav in test] == [4, 5]
+
+
+def test_time_split_at_timestamp():
+    favorites = [_fav(1, 1, 1), _fav(1, 2, 2), _fav(2, 3, 3)]
+    train, test = time_split(favorites, split_at=datetime(2025, 6, 2))
+    assert train == [_fav(1, 1, 1)]
+    assert test == [_fav(1, 2, 2), _fav(2, 3, 3)]
+
+
+def test_percentile_interpolates():
+    values = [4.0, 1.0, 3.0, 2.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 99) == 0.0
+    assert percentile([7.0], 90) == 7.0
+
+
+def test_parse_timestamp_normalises_to_naive_utc():
+    assert parse_timestamp("2025-06-05T10:00:00Z") == datetime(2025, 6, 5, 10, 0)
+    assert parse_timestamp("2025-06-05T18:00:00+08:00") == datetime(2025, 6, 5, 10, 0)
+    assert parse_timestamp("2025-06-05T10:00:00") == datetime(2025, 6, 5, 10, 0)
+
+
+def test_load_favorites_from_jsonl_mixed_timezones(tmp_path):
+    path = tmp_path / "favorites.jsonl"
+    rows = [
+        {"user_id": 1, "post_id": 2, "created_at": "2025-06-05T10:00:00Z"},
+        {"user_id": 2, "post_id": 3, "created_at": "2025-06-05T09:00:00"},
+    ]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n\n", encoding="utf-8")
+
+    favorites, post_ids = load_favorites_from_jsonl(str(path))
+    assert post_ids == [2, 3]
+    train, test = time_split(favorites, train_ratio=0.5)
+    assert train[0][:2] == (2, 3)
+    assert test[0][:2] == (1, 2)
+
+
+@pytest.mark.parametrize("line", [
+    "[1, 2]",
+    '{"user_id": 1, "post_id": 2}',
+    '{"user_id": "x", "post_id": 2, "created_at": "2025-06-05"}',
+    '{"user_id": 1, "post_id": 2, "created_at": 20250605}',
+    "not json",
+])
+def test_load_favorites_from_jsonl_rejects_bad_records(tmp_path, line):
+    path = tmp_path / "favorites.jsonl"
+    path.write_text(line + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="line 1"):
+        load_favorites_from_jsonl(str(path))
+
+
+def test_evaluate_strategy_metrics_on_fixed_dataset():
+    train = [_fav(1, 1, 1), _fav(2, 1, 1), _fav(2, 2, 2)]
+    session = build_train_session(train, post_ids=[1, 2, 3, 4])
+    test_by_user = {1: {2, 3}, 2: {4}}
+    fixed = {1: [2, 4], 2: [3]}
+    calls = []
+
+    def strategy(session, user_id, limit):
+        calls.append(user_id)
+        return [SimpleNamespace(id=post_id) for post_id in fixed[user_id]]
+
+    try:
+        metrics = evaluate_strategy(session, strategy, test_by_user, catalog_size=4, k=2)
+    finally:
+        session.close()
+
+    assert calls == [1, 1, 2, 2]  # 每个用户一次冷调用、一次热调用
+    assert metrics["users"] == 2
+    # 用户 1 命中 {2}: precision 1/2, recall 1/2；用户 2 没有命中
+    assert metrics["precision@2"] == pytest.approx(0.25)
+    assert metrics["recall@2"] == pytest.approx(0.25)
+    assert metrics["coverage"] == pytest.approx(0.75)  # 推荐过 {2, 3, 4}，共 4 个帖子
+    assert metrics["cold_p50_ms"] >= 0 and metrics["warm_p50_ms"] >= 0
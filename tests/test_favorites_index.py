@@ -0,0 +1,155 @@
+# tests/test_favorites_index.py
+import pytest
+
+pytest.importorskip("sqlmodel")
+
+from app.services import favorites_index as favorites_index_module
+from app.services.favorites_index import FavoriteSet, FavoritesIndex, get_favorites_index
+
+
+class FakeSession:
+    def __init__(self, in_transaction=False):
+        self.info = {}
+        self._in_transaction = in_transaction
+
+    def in_transaction(self):
+        return self._in_transaction
+
+
+def _index_with_data(data, **kwargs):
+    """
+    用内存中的 data (user_id -> [post_id]) 代替数据库查询，并记录加载次数。
+    """
+    index = FavoritesIndex(**kwargs)
+    index.loads = []
+
+    def load(session, user_ids):
+        index.loads.append(list(user_ids))
+        return {user_id: list(data.get(user_id, [])) for user_id in user_ids}
+
+    index._load = load
+    return index
+
+
+def test_favorite_set_membership_and_copy_on_write():
+    favorites = FavoriteSet([5, 1, 3, 3])
+    assert list(favorites) == [1, 3, 5]
+    assert 3 in favorites and 4 not in favorites
+    updated = favorites.with_added(4).with_added(4).without(1).without(100)
+    assert list(updated) == [3, 4, 5]
+    assert len(updated) == 3
+    assert list(favorites) == [1, 3, 5]  # 原集合不变
+    assert favorites.with_added(3) is favorites
+    assert favorites.without(100) is favorites
+
+
+def test_favorite_set_exclude_merge_matches_list_path():
+    mine = FavoriteSet([1, 3, 5, 7])
+    other = [0, 1, 2, 5, 6, 9]
+    assert mine.exclude(FavoriteSet(other)) == [0, 2, 6, 9]
+    assert mine.exclude(other) == [0, 2, 6, 9]
+    assert mine.exclude([9, 1, 2]) == [9, 2]  # 普通序列保持原有顺序
+    assert FavoriteSet().exclude(FavoriteSet([2, 1])) == [1, 2]
+    assert mine.exclude(FavoriteSet()) == []
+
+
+def test_get_many_batches_misses_and_hits_cache():
+    index = _index_with_data({1: [10, 11], 2: [11]}, shared=False, ttl=0)
+    session = FakeSession()
+    result = index.get_many(session, [1, 2, 1])
+    assert list(result[1]) == [10, 11] and list(result[2]) == [11]
+    assert index.loads == [[1, 2]]
+    assert 10 in index.get(session, 1)
+    assert index.loads == [[1, 2]]
+    assert index.stats()["hits"] == 1
+
+
+def test_lru_eviction():
+    index = _index_with_data({}, capacity=2, ttl=0, shared=False)
+    session = FakeSession()
+    index.get(session, 1)
+    index.get(session, 2)
+    index.get(session, 1)  # 1 变为最近使用
+    index.get(session, 3)  # 淘汰 2
+    index.loads.clear()
+    index.get(session, 1)
+    index.get(session, 2)
+    assert index.loads == [[2]]
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(favorites_index_module.time, "monotonic", lambda: now[0])
+    index = _index_with_data({1: [10]}, ttl=60, shared=False)
+    session = FakeSession()
+    index.get(session, 1)
+    now[0] += 30
+    index.get(session, 1)
+    assert len(index.loads) == 1
+    now[0] += 31
+    index.get(session, 1)
+    assert len(index.loads) == 2
+
+
+def test_write_updates_cached_set():
+    index = _index_with_data({1: [10]}, shared=False, ttl=0)
+    session = FakeSession()
+    before = index.get(session, 1)
+    index.add(1, 12)
+    index.discard(1, 10)
+    assert list(index.get(session, 1)) == [12]
+    assert list(before) == [10]  # 已经拿到的集合不会被写入修改
+    assert len(index.loads) == 1
+
+
+def test_write_during_load_is_not_cached():
+    index = FavoritesIndex(ttl=0)
+    index.loads = 0
+
+    def load(session, user_ids):
+        index.loads += 1
+        if index.loads == 1:
+            index.add(1, 99)  # 并发写入发生在查询执行期间
+        return {1: [10]}
+
+    index._load = load
+    session = FakeSession()
+    assert list(index.get(session, 1)) == [10]
+    index.get(session, 1)
+    assert index.loads == 2
+
+
+def test_shared_index_does_not_cache_stale_snapshot():
+    index = _index_with_data({1: [10]}, ttl=0, shared=True)
+    # 事务在第一次写入前开始 (快照代数 0)，之后另一个请求提交了收藏
+    session = FakeSession(in_transaction=True)
+    session.info["favorites_index_generation"] = index.generation
+    index.add(1, 11)
+    index.get(session, 1)
+    index.get(session, 1)
+    assert len(index.loads) == 2
+
+    # 快照晚于最后一次写入时可以缓存
+    fresh = FakeSession(in_transaction=True)
+    fresh.info["favorites_index_generation"] = index.generation
+    index.get(fresh, 1)
+    index.get(fresh, 1)
+    assert len(index.loads) == 3
+
+    # 事务已开启但没有记录快照代数时不缓存
+    index.invalidate(1)
+    unknown = FakeSession(in_transaction=True)
+    index.get(unknown, 1)
+    index.get(unknown, 1)
+    assert len(index.loads) == 5
+
+
+def test_default_index_is_scoped_to_session(monkeypatch):
+    monkeypatch.setattr(favorites_index_module, "FAVORITES_INDEX_SHARED", False)
+    first, second = FakeSession(), FakeSession()
+    assert get_favorites_index(first) is get_favorites_index(first)
+    assert get_favorites_index(first) is not get_favorites_index(second)
+    assert get_favorites_index(first) is not favorites_index_module.favorites_index
+
+    monkeypatch.setattr(favorites_index_module, "FAVORITES_INDEX_SHARED", True)
+    assert get_favorites_index(first) is favorites_index_module.favorites_index
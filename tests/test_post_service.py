@@ -0,0 +1,73 @@
+# tests/test_post_service.py
+import asyncio
+import io
+import os
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("sqlmodel")
+pytest.importorskip("fastapi")
+
+from fastapi import UploadFile
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+
+@pytest.fixture
+def post_service(tmp_path, monkeypatch):
+    try:
+        import app.config  # noqa: F401
+    except ImportError:
+        # app/config.py 不在本仓库中；这里只提供 post_service 需要的 UPLOAD_DIR
+        config = types.ModuleType("app.config")
+        config.UPLOAD_DIR = str(tmp_path)
+        monkeypatch.setitem(sys.modules, "app.config", config)
+    from app.services import post_service as module
+    monkeypatch.setattr(module, "UPLOAD_DIR", str(tmp_path))
+    return module
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="notes.txt")
+
+
+def test_create_post_writes_upload_in_background(post_service, session, tmp_path):
+    from app.models.posts import PostCreate
+    from app.utils.task_queue import task_queue
+
+    async def scenario():
+        await task_queue.start()
+        try:
+            post = post_service.db_create_post(
+                session, PostCreate(title="t", content="c"), author_id=7, file=_upload(b"hello")
+            )
+            written_before_drain = os.path.exists(tmp_path / "7_notes.txt")
+        finally:
+            await task_queue.stop()
+        return post, written_before_drain
+
+    post, written_before_drain = asyncio.run(scenario())
+    assert post.file_path == os.path.join("static", "uploads", "7_notes.txt")
+    assert not written_before_drain  # 写盘发生在请求返回之后
+    assert (tmp_path / "7_notes.txt").read_bytes() == b"hello"
+    assert not (tmp_path / "7_notes.txt.part").exists()
+
+
+def test_create_post_large_upload_is_written_inline(post_service, session, tmp_path, monkeypatch):
+    from app.models.posts import PostCreate
+
+    monkeypatch.setattr(post_service, "UPLOAD_ASYNC_MAX_BYTES", 3)
+    post_service.db_create_post(
+        session, PostCreate(title="t", content="c"), author_id=7, file=_upload(b"hello")
+    )
+    assert (tmp_path / "7_notes.txt").read_bytes() == b"hello"
@@ -0,0 +1,54 @@
+# tests/test_recommendation_service.py
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("sqlmodel")
+
+from app.scripts.evaluate_recommendations import build_train_session
+from app.services import favorites_index as favorites_index_module
+from app.services.recommendation_service import get_item_based_collaborative_filtering_recommendations
+
+# user_id -> 收藏的 post_id
+FAVORITES = {
+    1: [1, 2],
+    2: [1, 3, 4],
+    3: [2, 3, 5],
+    4: [6],
+}
+
+
+@pytest.fixture(params=[False, True], ids=["session-index", "shared-index"])
+def session(request, monkeypatch):
+    monkeypatch.setattr(favorites_index_module, "FAVORITES_INDEX_SHARED", request.param)
+    favorites_index_module.favorites_index.invalidate()
+    created_at = datetime(2025, 6, 1)
+    train = [
+        (user_id, post_id, created_at)
+        for user_id, post_ids in FAVORITES.items()
+        for post_id in post_ids
+    ]
+    session = build_train_session(train, post_ids=range(1, 8))
+    yield session
+    session.close()
+    favorites_index_module.favorites_index.invalidate()
+
+
+def _recommend(session, user_id, limit):
+    return [
+        post.id
+        for post in get_item_based_collaborative_filtering_recommendations(session, user_id, limit=limit)
+    ]
+
+
+def test_cf_ranks_by_score_then_post_id(session):
+    # 用户 1 经帖子 1 找到用户 2 (推荐 3、4)，经帖子 2 找到用户 3 (推荐 3、5)
+    assert _recommend(session, 1, limit=5) == [3, 4, 5]
+    assert _recommend(session, 1, limit=2) == [3, 4]  # 4 和 5 同分，按 ID 取 4
+    # 重复调用 (索引已加载) 结果不变
+    assert _recommend(session, 1, limit=5) == [3, 4, 5]
+
+
+def test_cf_without_neighbours_or_favorites(session):
+    assert _recommend(session, 4, limit=5) == []  # 没有其他用户收藏帖子 6
+    assert _recommend(session, 99, limit=5) == []  # 没有收藏
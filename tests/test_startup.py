@@ -0,0 +1,74 @@
+# tests/test_startup.py
+import pytest
+
+pytest.importorskip("sqlmodel")
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+from app.startup import (
+    StartupTimer,
+    compute_metadata_fingerprint,
+    ensure_schema,
+    get_stored_fingerprint,
+    store_fingerprint,
+)
+
+
+def _engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+def _metadata(extra_column=False, index=False):
+    metadata = MetaData()
+    columns = [Column("id", Integer, primary_key=True), Column("title", String(50))]
+    if extra_column:
+        columns.append(Column("summary", String(50)))
+    table = Table("articles", metadata, *columns)
+    if index:
+        Index("ix_articles_title", table.c.title)
+    return metadata
+
+
+def test_fingerprint_is_stable_and_tracks_changes():
+    base = compute_metadata_fingerprint(_metadata())
+    assert base == compute_metadata_fingerprint(_metadata())
+    assert base != compute_metadata_fingerprint(_metadata(extra_column=True))
+    assert base != compute_metadata_fingerprint(_metadata(index=True))
+
+
+def test_store_fingerprint_inserts_then_updates():
+    engine = _engine()
+    assert get_stored_fingerprint(engine) is None  # 表还不存在
+
+    assert store_fingerprint(engine, "a" * 64)
+    assert get_stored_fingerprint(engine) == "a" * 64
+
+    assert store_fingerprint(engine, "b" * 64)
+    assert get_stored_fingerprint(engine) == "b" * 64
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM schema_version").scalar() == 1
+
+
+def test_ensure_schema_skips_create_all_when_fingerprint_matches():
+    engine = _engine()
+
+    first = StartupTimer()
+    assert ensure_schema(engine, timer=first) is True
+    assert "create_all" in dict(first.phases)
+    assert {"users", "posts", "user_favorites"} <= set(inspect(engine).get_table_names())
+
+    second = StartupTimer()
+    assert ensure_schema(engine, timer=second) is False
+    assert "create_all" not in dict(second.phases)
+
+    forced = StartupTimer()
+    assert ensure_schema(engine, timer=forced, force=True) is True
+    assert "create_all" in dict(forced.phases)
+
+
+def test_ensure_schema_reruns_create_all_after_model_change():
+    engine = _engine()
+    store_fingerprint(engine, "0" * 64)  # 模拟旧版本模型记录的指纹
+    assert ensure_schema(engine) is True
+    assert get_stored_fingerprint(engine) != "0" * 64
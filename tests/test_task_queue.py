@@ -0,0 +1,158 @@
+# tests/test_task_queue.py
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.task_queue import ON_FULL_DROP, Job, TaskQueue, register_handler
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_retry_until_success():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("boom")
+
+    async def scenario():
+        queue = TaskQueue(workers=1, max_retries=3, retry_backoff=0.001)
+        await queue.start()
+        assert queue.submit(flaky)
+        await queue.stop()
+        return queue.metrics()
+
+    metrics = _run(scenario())
+    assert len(calls) == 3
+    assert metrics["retried"] == 2
+    assert metrics["completed"] == 1
+    assert metrics["failed"] == 0
+
+
+def test_failed_after_max_retries():
+    def always_fails():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        queue = TaskQueue(workers=1, max_retries=2, retry_backoff=0.001)
+        await queue.start()
+        queue.submit(always_fails)
+        await queue.stop()
+        return queue.metrics()
+
+    metrics = _run(scenario())
+    assert metrics["retried"] == 2
+    assert metrics["failed"] == 1
+    assert metrics["completed"] == 0
+
+
+def test_backoff_delay_doubles_and_is_capped():
+    queue = TaskQueue(retry_backoff=0.5, max_backoff=3)
+    assert [queue.backoff_delay(attempt) for attempt in range(1, 6)] == [0.5, 1.0, 2.0, 3, 3]
+
+
+def test_stop_drains_queued_jobs():
+    done = []
+
+    async def slow(n):
+        await asyncio.sleep(0.01)
+        done.append(n)
+
+    async def scenario():
+        queue = TaskQueue(workers=2)
+        await queue.start()
+        for n in range(5):
+            queue.submit(slow, args=(n,))
+        await queue.stop(timeout=5)
+        return queue.metrics()
+
+    metrics = _run(scenario())
+    assert sorted(done) == [0, 1, 2, 3, 4]
+    assert metrics["completed"] == 5
+    assert metrics["depth"] == 0
+
+
+def test_stop_timeout_reports_running_jobs(capsys):
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        queue = TaskQueue(workers=1)
+        await queue.start()
+        queue.submit(hang)
+        await asyncio.sleep(0)
+        await queue.stop(timeout=0.05)
+
+    _run(scenario())
+    assert "0 queued and 1 running jobs discarded" in capsys.readouterr().out
+
+
+def test_full_queue_runs_overflow_off_the_loop_with_retry():
+    threads = []
+
+    def flaky_overflow():
+        threads.append(threading.current_thread())
+        if len(threads) < 2:
+            raise RuntimeError("boom")
+
+    async def scenario():
+        gate = asyncio.Event()
+        queue = TaskQueue(maxsize=1, workers=1, retry_backoff=0.001)
+        await queue.start()
+        queue.submit(gate.wait)  # 工作协程取走并阻塞在这个任务上
+        await asyncio.sleep(0)
+        queue.submit(gate.wait)  # 占满队列
+        assert queue.submit(flaky_overflow)
+        assert threads == []  # 没有在事件循环线程中同步执行
+        assert not queue.submit(flaky_overflow, on_full=ON_FULL_DROP)
+        gate.set()
+        await queue.stop(timeout=5)
+        return queue.metrics()
+
+    metrics = _run(scenario())
+    assert len(threads) == 2
+    assert all(thread is not threading.main_thread() for thread in threads)
+    assert metrics["overflow_run"] == 1
+    assert metrics["retried"] == 1
+    assert metrics["dropped"] == 1
+
+
+def test_job_handed_over_while_stopping_still_runs():
+    calls = []
+
+    async def scenario():
+        queue = TaskQueue(workers=1)
+        await queue.start()
+        # 模拟跨线程 submit：通过了 _accepting 检查，_put 回调在 stop() 开始之后才执行
+        job = Job(calls.append, ("late",), {}, "thread", 0, "run")
+        queue._loop.call_soon(queue._put, job)
+        await queue.stop(timeout=5)
+        await asyncio.sleep(0)
+        return queue.metrics()
+
+    metrics = _run(scenario())
+    assert calls == ["late"]
+    assert metrics["depth"] == 0
+
+
+def test_not_running_runs_inline_and_warns_once(capsys):
+    calls = []
+    queue = TaskQueue()
+    assert queue.submit(calls.append, args=(1,))
+    assert queue.submit(calls.append, args=(2,))
+    assert calls == [1, 2]
+    assert capsys.readouterr().out.count("task queue not running") == 1
+
+
+def test_process_executor_rejects_coroutines():
+    async def handler():
+        pass
+
+    with pytest.raises(ValueError):
+        TaskQueue().submit(handler, executor="process")
+    with pytest.raises(ValueError):
+        register_handler("post_created", handler, executor="process")